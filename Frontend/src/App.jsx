@@ -1,10 +1,13 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import VideoPlayer from './components/VideoPlayer';
 import OverlayCanvas from './components/OverlayCanvas';
 import OverlayControls from './components/OverlayControls';
 import { getOverlays } from './api/overlays';
+import { getActiveSceneBundle } from './api/scenes';
 import './App.css';
 
+const SCENE_POLL_INTERVAL = 2000; // ms between active scene checks
+
 function App() {
   const OBS_RTSP_URL = 'rtsp://localhost:8554/live/mystream';
   
@@ -17,10 +20,15 @@ function App() {
   const [streamStatus, setStreamStatus] = useState('Stream not started');
   const [streamMode, setStreamMode] = useState('obs'); // 'obs' or 'public'
   const [statusPolling, setStatusPolling] = useState(null);
+  const [activeSceneId, setActiveSceneId] = useState(null);
+  const sceneVersionRef = useRef(null); // "<id>-<version>" of the shown scene
 
-  // Load overlays on mount
+  // Load overlays on mount, then follow scene activations. The bundle
+  // endpoint answers 304 until the active scene or its overlays change.
   useEffect(() => {
     loadOverlays();
+    const interval = setInterval(() => loadOverlays(false), SCENE_POLL_INTERVAL);
+    return () => clearInterval(interval);
   }, []);
 
   // Cleanup polling on unmount
@@ -32,10 +40,17 @@ function App() {
     };
   }, [statusPolling]);
 
-  const loadOverlays = async () => {
+  const loadOverlays = async (force = true) => {
     try {
-      const data = await getOverlays();
-      setOverlays(data);
+      // Render the active scene if there is one, else overlays outside any scene
+      const bundle = await getActiveSceneBundle();
+      const sceneVersion = bundle ? `${bundle.scene._id}-${bundle.scene.version}` : null;
+      if (!force && sceneVersion === sceneVersionRef.current) {
+        return;
+      }
+      sceneVersionRef.current = sceneVersion;
+      setActiveSceneId(bundle ? bundle.scene._id : null);
+      setOverlays(bundle ? bundle.overlays : await getOverlays());
     } catch (err) {
       console.error('Failed to load overlays:', err);
     }
@@ -257,7 +272,10 @@ function App() {
             </div>
 
             <div className="controls-section">
-              <OverlayControls onOverlayUpdate={handleOverlayUpdate} />
+              <OverlayControls
+                sceneId={activeSceneId}
+                onOverlayUpdate={handleOverlayUpdate}
+              />
             </div>
           </div>
         )}
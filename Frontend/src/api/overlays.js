@@ -7,8 +7,9 @@ export const createOverlay = async (overlayData) => {
   return response.data.overlay;
 };
 
-export const getOverlays = async () => {
-  const response = await axios.get(`${API_BASE_URL}/overlays`);
+export const getOverlays = async (sceneId = null) => {
+  const params = sceneId ? { scene_id: sceneId } : {};
+  const response = await axios.get(`${API_BASE_URL}/overlays`, { params });
   return response.data.overlays;
 };
 
@@ -22,7 +23,8 @@ export const deleteOverlay = async (id) => {
   return response.data;
 };
 
-export const deleteAllOverlays = async () => {
-  const response = await axios.delete(`${API_BASE_URL}/overlays`);
+export const deleteAllOverlays = async (sceneId = null) => {
+  const params = sceneId ? { scene_id: sceneId } : {};
+  const response = await axios.delete(`${API_BASE_URL}/overlays`, { params });
   return response.data;
 };
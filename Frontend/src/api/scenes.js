@@ -0,0 +1,44 @@
+import axios from 'axios';
+
+const API_BASE_URL = '/api';
+
+export const createScene = async (name) => {
+  const response = await axios.post(`${API_BASE_URL}/scenes`, { name });
+  return response.data.scene;
+};
+
+export const getScenes = async () => {
+  const response = await axios.get(`${API_BASE_URL}/scenes`);
+  return response.data;
+};
+
+export const activateScene = async (id) => {
+  const response = await axios.post(`${API_BASE_URL}/scenes/${id}/activate`);
+  return response.data;
+};
+
+// Last active-scene bundle and its ETag, reused when the server answers 304
+let cachedBundle = null;
+let cachedEtag = null;
+
+// Returns the active scene's bundle, or null when no scene is active
+export const getActiveSceneBundle = async () => {
+  const response = await axios.get(`${API_BASE_URL}/scenes/active/bundle`, {
+    headers: cachedEtag ? { 'If-None-Match': cachedEtag } : {},
+    validateStatus: (status) => status === 200 || status === 304 || status === 404,
+  });
+
+  if (response.status === 404) {
+    cachedBundle = null;
+    cachedEtag = null;
+  } else if (response.status === 200) {
+    cachedBundle = response.data;
+    cachedEtag = response.headers.etag || null;
+  }
+  return cachedBundle;
+};
+
+export const deleteScene = async (id) => {
+  const response = await axios.delete(`${API_BASE_URL}/scenes/${id}`);
+  return response.data;
+};
@@ -45,16 +45,20 @@ function OverlayCanvas({ overlays, onOverlayUpdate }) {
 
   const handleImageError = (overlayId, originalUrl) => {
     console.error('Image failed to load:', originalUrl);
-    // Try using proxy
-    setImageErrors(prev => ({ ...prev, [overlayId]: true }));
+    // Proxy failed: try the direct URL, then give up
+    setImageErrors(prev => ({ ...prev, [overlayId]: prev[overlayId] ? 'failed' : true }));
   };
 
   const getImageUrl = (overlay) => {
-    // If direct URL failed, use proxy
-    if (imageErrors[overlay._id]) {
-      return `/api/image-proxy?url=${encodeURIComponent(overlay.content)}`;
+    // If proxy failed (or it isn't a remote URL), load the original directly
+    if (imageErrors[overlay._id] || !/^https?:\/\//i.test(overlay.content)) {
+      return overlay.content;
     }
-    return overlay.content;
+    // Ask the proxy for a variant sized to the overlay box (sharp on HiDPI)
+    const scale = window.devicePixelRatio || 1;
+    const w = Math.round(overlay.width * scale);
+    const h = Math.round(overlay.height * scale);
+    return `/api/image-proxy?url=${encodeURIComponent(overlay.content)}&w=${w}&h=${h}`;
   };
 
   return (
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { createOverlay, getOverlays, deleteOverlay, deleteAllOverlays } from '../api/overlays';
 import './OverlayControls.css';
 
-function OverlayControls({ onOverlayUpdate }) {
+function OverlayControls({ sceneId, onOverlayUpdate }) {
   const [overlayType, setOverlayType] = useState('text');
   const [textContent, setTextContent] = useState('');
   const [imageUrl, setImageUrl] = useState('');
@@ -17,9 +17,10 @@ function OverlayControls({ onOverlayUpdate }) {
   const [imageError, setImageError] = useState('');
   const [isValidating, setIsValidating] = useState(false);
 
+  // Reload the list when the active scene changes
   useEffect(() => {
     loadOverlays();
-  }, []);
+  }, [sceneId]);
 
   // Preview image when URL changes
   useEffect(() => {
@@ -42,7 +43,7 @@ function OverlayControls({ onOverlayUpdate }) {
 
   const loadOverlays = async () => {
     try {
-      const data = await getOverlays();
+      const data = await getOverlays(sceneId);
       setOverlays(data);
     } catch (err) {
       console.error('Failed to load overlays:', err);
@@ -218,6 +219,11 @@ function OverlayControls({ onOverlayUpdate }) {
     }
 
     try {
+      // New overlays join the active scene, on top of its existing ones
+      if (sceneId) {
+        overlayData.scene_id = sceneId;
+        overlayData.z_order = overlays.reduce((top, o) => Math.max(top, o.z_order || 0), -1) + 1;
+      }
       await createOverlay(overlayData);
 
       onOverlayUpdate();
@@ -244,7 +250,7 @@ function OverlayControls({ onOverlayUpdate }) {
   const handleDeleteAll = async () => {
     if (window.confirm('Delete all overlays? This cannot be undone.')) {
       try {
-        await deleteAllOverlays();
+        await deleteAllOverlays(sceneId);
         onOverlayUpdate();
         loadOverlays();
       } catch (err) {
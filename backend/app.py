@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request, send_from_directory, abort
+from flask import Flask, Response, jsonify, request, send_file, abort
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
@@ -7,7 +7,10 @@ import requests
 from io import BytesIO
 from db import init_db, get_db_status
 from routes.overlays import overlays_bp
+from routes.scenes import scenes_bp
 from services.rtsp_to_hls import RTSPConverter
+from services.hls_cache import HLSFileCache
+from services.image_variants import ImageVariantCache
 
 load_dotenv()
 
@@ -18,14 +21,26 @@ CORS(app)
 HLS_DIR = os.path.join(os.path.dirname(__file__), "hls")
 os.makedirs(HLS_DIR, exist_ok=True)
 
+# Shared playlist/segment cache (micro-cache TTL in seconds, below hls_time)
+hls_cache = HLSFileCache(HLS_DIR, ttl=float(os.getenv('HLS_CACHE_TTL', 0.5)))
+
+# Resized/recompressed image overlay variants, cached on disk
+IMAGE_CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache", "images")
+image_variants = ImageVariantCache(
+    IMAGE_CACHE_DIR,
+    max_bytes=int(os.getenv('IMAGE_CACHE_MAX_MB', 256)) * 1024 * 1024,
+    max_age=int(os.getenv('IMAGE_CACHE_TTL', 86400))
+)
+
 # Initialize database with fallback
 db_available = init_db(app)
 
 # Register blueprints
 app.register_blueprint(overlays_bp, url_prefix='/api')
+app.register_blueprint(scenes_bp, url_prefix='/api')
 
 # RTSP converter instance
-rtsp_converter = RTSPConverter()
+rtsp_converter = RTSPConverter(hls_cache=hls_cache)
 
 @app.route('/api/stream/start', methods=['POST'])
 def start_stream():
@@ -33,19 +48,24 @@ def start_stream():
     data = request.json
     rtsp_url = data.get('rtspUrl') or data.get('rtsp_url')  # Support both formats
     mode = data.get('mode', 'public')  # 'obs' or 'public'
+    outputs = data.get('outputs', [])  # Extra tee outputs: record, rtmp, srt, hls
     
     if not rtsp_url:
         return jsonify({'success': False, 'error': 'RTSP URL is required'}), 400
     
     try:
-        hls_url = rtsp_converter.start_conversion(rtsp_url, mode)
+        hls_url = rtsp_converter.start_conversion(rtsp_url, mode, outputs)
         return jsonify({
             'success': True,
             'hlsUrl': hls_url,
             'mode': mode,
+            'outputs': rtsp_converter.outputs,
             'status': 'started',
             'message': 'Stream started successfully'
         })
+    except ValueError as e:
+        # Invalid RTSP URL or extra output definition
+        return jsonify({'success': False, 'error': str(e), 'status': 'error'}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e), 'status': 'error'}), 500
 
@@ -79,14 +99,17 @@ def hls_files(filename):
         # Set correct MIME types
         if filename.endswith('.m3u8'):
             mimetype = 'application/vnd.apple.mpegurl'
-            cache_control = 'no-store, no-cache, must-revalidate'  # No cache for playlist
+            cache_control = 'no-cache, must-revalidate'  # Always revalidate playlist (ETag)
         elif filename.endswith('.ts'):
             mimetype = 'video/mp2t'
             cache_control = 'public, max-age=3'  # Short cache for segments (3 seconds)
         else:
             return jsonify({'error': 'Invalid file type', 'message': 'Only .m3u8 and .ts files are allowed'}), 400
         
-        response = send_from_directory(HLS_DIR, filename, mimetype=mimetype)
+        # Read once per change and share the bytes across concurrent viewers
+        entry = hls_cache.get(filename)
+        response = Response(entry['data'], mimetype=mimetype)
+        response.set_etag(entry['etag'])
         
         # Add CORS headers
         response.headers['Access-Control-Allow-Origin'] = '*'
@@ -99,7 +122,8 @@ def hls_files(filename):
             response.headers['Pragma'] = 'no-cache'
             response.headers['Expires'] = '0'
         
-        return response
+        # Answer If-None-Match with 304 and Range requests on segments with 206
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(entry['data']))
     except FileNotFoundError:
         return jsonify({
             'error': 'File not found',
@@ -112,52 +136,89 @@ def hls_files(filename):
             'message': str(e)
         }), 500
 
+def guess_image_type(image_url):
+    """Guess an image MIME type from the URL extension"""
+    lower_url = image_url.lower().split('?')[0]
+    if lower_url.endswith('.png'):
+        return 'image/png'
+    elif lower_url.endswith('.jpg') or lower_url.endswith('.jpeg'):
+        return 'image/jpeg'
+    elif lower_url.endswith('.gif'):
+        return 'image/gif'
+    elif lower_url.endswith('.webp'):
+        return 'image/webp'
+    elif lower_url.endswith('.svg'):
+        return 'image/svg+xml'
+    return 'image/jpeg'  # Default fallback
+
+def parse_dimension(value):
+    """Parse an optional w/h query value; raises ValueError unless a positive int"""
+    if value is None:
+        return None
+    size = int(value)
+    if size <= 0:
+        raise ValueError(value)
+    return size
+
+def fetch_image(image_url):
+    """Download an image from its origin, returning (content_type, bytes)"""
+    # Fetch the image with proper headers
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Referer': 'https://www.google.com/',
+    }
+    
+    response = requests.get(image_url, headers=headers, timeout=10, stream=True)
+    response.raise_for_status()
+    
+    # Get content type
+    content_type = response.headers.get('Content-Type', 'image/jpeg').split(';')[0].strip()
+    
+    # If it's not an image, try to detect from URL
+    if not content_type.startswith('image/'):
+        content_type = guess_image_type(image_url)
+    
+    return content_type, response.content
+
 @app.route('/api/image-proxy', methods=['GET'])
 def image_proxy():
-    """Proxy images to avoid CORS and hotlinking issues"""
+    """Proxy images to avoid CORS and hotlinking issues.
+
+    Optional w/h query parameters downscale the image to the overlay box, and
+    the output format is negotiated from the Accept header (AVIF/WebP).
+    """
     image_url = request.args.get('url')
+    accept = request.headers.get('Accept', '')
     
     if not image_url:
         return jsonify({'error': 'URL parameter is required'}), 400
+    try:
+        width = parse_dimension(request.args.get('w'))
+        height = parse_dimension(request.args.get('h'))
+    except ValueError:
+        return jsonify({'error': 'w and h must be positive integers'}), 400
+    
+    choice = image_variants.negotiate_format(accept)
     
     try:
-        # Fetch the image with proper headers
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Referer': 'https://www.google.com/',
-        }
-        
-        response = requests.get(image_url, headers=headers, timeout=10, stream=True)
-        response.raise_for_status()
-        
-        # Get content type
-        content_type = response.headers.get('Content-Type', 'image/jpeg')
-        
-        # If it's not an image, try to detect from URL
-        if not content_type.startswith('image/'):
-            # Try to guess from URL extension
-            if image_url.lower().endswith('.png'):
-                content_type = 'image/png'
-            elif image_url.lower().endswith('.jpg') or image_url.lower().endswith('.jpeg'):
-                content_type = 'image/jpeg'
-            elif image_url.lower().endswith('.gif'):
-                content_type = 'image/gif'
-            elif image_url.lower().endswith('.webp'):
-                content_type = 'image/webp'
-            elif image_url.lower().endswith('.svg'):
-                content_type = 'image/svg+xml'
-            else:
-                content_type = 'image/jpeg'  # Default fallback
-        
-        # Read image data
-        image_data = BytesIO(response.content)
+        if width is None and height is None and choice == 'original':
+            # Nothing to gain from re-encoding: pass the original bytes through
+            content_type, image_bytes = fetch_image(image_url)
+        else:
+            # Cached variants skip the origin; concurrent misses share one
+            # download and one encode
+            key = image_variants.variant_key(image_url, width, height, choice)
+            path, content_type, image_bytes = image_variants.get_or_build(
+                key, lambda: fetch_image(image_url), width, height, choice
+            )
+            if path:
+                return variant_response(path, content_type)
         
         # Create response
-        from flask import send_file
         return send_file(
-            image_data,
+            BytesIO(image_bytes),
             mimetype=content_type,
             as_attachment=False,
             download_name='image'
@@ -170,6 +231,13 @@ def image_proxy():
     except Exception as e:
         return jsonify({'error': f'Proxy error: {str(e)}'}), 500
 
+def variant_response(path, mimetype):
+    """Send a cached image variant; it is reused until the disk cache expires it"""
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+    response.headers['Cache-Control'] = f'public, max-age={image_variants.max_age}'
+    response.headers['Vary'] = 'Accept'
+    return response
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint with database status"""
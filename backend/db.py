@@ -22,7 +22,7 @@ def init_db(app):
         mongo.db.command('ping')
         
         # Create indexes
-        mongo.db.overlays.create_index('created_at')
+        create_indexes()
         
         db_available = True
         print("✓ MongoDB connected successfully")
@@ -38,7 +38,7 @@ def init_db(app):
             app.config['MONGO_URI'] = 'mongodb://localhost:27017/rtsp_overlay_app'
             mongo.init_app(app)
             mongo.db.command('ping')
-            mongo.db.overlays.create_index('created_at')
+            create_indexes()
             
             db_available = True
             print("✓ Connected to local MongoDB")
@@ -50,6 +50,13 @@ def init_db(app):
             print("⚠ Using in-memory overlays (data will not persist)")
             return False
 
+def create_indexes():
+    """Create collection indexes"""
+    mongo.db.overlays.create_index('created_at')
+    # Scene bundles are loaded by scene in z-order
+    mongo.db.overlays.create_index([('scene_id', 1), ('z_order', 1)])
+    mongo.db.scenes.create_index('name', unique=True)
+
 def get_db():
     """Get database instance"""
     if db_available:
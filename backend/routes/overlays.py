@@ -8,6 +8,7 @@ overlays_bp = Blueprint('overlays', __name__)
 
 # In-memory fallback storage
 in_memory_overlays = []
+in_memory_scenes = []
 
 def serialize_overlay(overlay):
     """Convert MongoDB document to JSON-serializable dict"""
@@ -19,6 +20,35 @@ def use_memory_storage():
     """Check if we should use in-memory storage"""
     return get_db() is None
 
+def is_valid_scene_id(scene_id):
+    """Check that a scene ID is well-formed for the current storage"""
+    if not isinstance(scene_id, str):
+        return False
+    return use_memory_storage() or ObjectId.is_valid(scene_id)
+
+def scene_exists(scene_id):
+    """Check that a scene with the given ID exists"""
+    if not is_valid_scene_id(scene_id):
+        return False
+    if use_memory_storage():
+        return any(s['_id'] == scene_id for s in in_memory_scenes)
+    return get_db().scenes.count_documents({'_id': ObjectId(scene_id)}, limit=1) > 0
+
+def bump_scene_version(scene_id):
+    """Increment a scene's version so its cached bundle is rebuilt"""
+    if not scene_id:
+        return
+    if use_memory_storage():
+        scene = next((s for s in in_memory_scenes if s['_id'] == scene_id), None)
+        if scene:
+            scene['version'] += 1
+            scene['updated_at'] = datetime.utcnow()
+    else:
+        get_db().scenes.update_one(
+            {'_id': ObjectId(scene_id)},
+            {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}}
+        )
+
 @overlays_bp.route('/overlays', methods=['POST'])
 def create_overlay():
     """Create a new overlay"""
@@ -71,6 +101,15 @@ def create_overlay():
         if 'opacity' in data:
             overlay['opacity'] = float(data['opacity'])
         
+        # Scene membership (overlays without a scene stay in the flat list)
+        if data.get('scene_id'):
+            if not is_valid_scene_id(data['scene_id']):
+                return jsonify({'success': False, 'error': 'Invalid scene_id'}), 400
+            if not scene_exists(data['scene_id']):
+                return jsonify({'success': False, 'error': 'Scene not found'}), 404
+            overlay['scene_id'] = data['scene_id']
+            overlay['z_order'] = int(data.get('z_order', 0))
+        
         # Use MongoDB or in-memory storage
         if use_memory_storage():
             overlay['_id'] = str(uuid.uuid4())
@@ -80,6 +119,8 @@ def create_overlay():
             result = db.overlays.insert_one(overlay)
             overlay['_id'] = str(result.inserted_id)
         
+        bump_scene_version(overlay.get('scene_id'))
+        
         return jsonify({
             'success': True,
             'overlay': overlay
@@ -90,14 +131,28 @@ def create_overlay():
 
 @overlays_bp.route('/overlays', methods=['GET'])
 def get_overlays():
-    """Get all overlays"""
+    """Get overlays outside any scene, or one scene's overlays with ?scene_id="""
     try:
+        scene_id = request.args.get('scene_id')
+        if scene_id is not None and not scene_exists(scene_id):
+            return jsonify({'success': False, 'error': 'Scene not found'}), 404
+        
         if use_memory_storage():
-            overlays = in_memory_overlays.copy()
+            if scene_id:
+                overlays = sorted(
+                    (o for o in in_memory_overlays if o.get('scene_id') == scene_id),
+                    key=lambda o: o['z_order']
+                )
+            else:
+                overlays = [o for o in in_memory_overlays if not o.get('scene_id')]
         else:
             db = get_db()
-            overlays = list(db.overlays.find().sort('created_at', 1))
-            overlays = [serialize_overlay(overlay) for overlay in overlays]
+            if scene_id:
+                # Served by the (scene_id, z_order) index
+                cursor = db.overlays.find({'scene_id': scene_id}).sort('z_order', 1)
+            else:
+                cursor = db.overlays.find({'scene_id': {'$exists': False}}).sort('created_at', 1)
+            overlays = [serialize_overlay(overlay) for overlay in cursor]
         
         return jsonify({
             'success': True,
@@ -142,11 +197,13 @@ def update_overlay(overlay_id):
                 return jsonify({'success': False, 'error': 'Overlay not found'}), 404
             
             # Update fields
-            allowed_fields = ['type', 'content', 'label', 'url', 'x', 'y', 'width', 'height', 'fontSize', 'color', 'backgroundColor', 'opacity']
+            allowed_fields = ['type', 'content', 'label', 'url', 'x', 'y', 'width', 'height', 'fontSize', 'color', 'backgroundColor', 'opacity', 'z_order']
             for field in allowed_fields:
                 if field in data:
                     if field in ['x', 'y', 'width', 'height', 'opacity']:
                         overlay[field] = float(data[field])
+                    elif field == 'z_order':
+                        overlay[field] = int(data[field])
                     else:
                         overlay[field] = data[field]
             overlay['updated_at'] = datetime.utcnow()
@@ -159,11 +216,13 @@ def update_overlay(overlay_id):
             
             # Build update document
             update_data = {'updated_at': datetime.utcnow()}
-            allowed_fields = ['type', 'content', 'label', 'url', 'x', 'y', 'width', 'height', 'fontSize', 'color', 'backgroundColor', 'opacity']
+            allowed_fields = ['type', 'content', 'label', 'url', 'x', 'y', 'width', 'height', 'fontSize', 'color', 'backgroundColor', 'opacity', 'z_order']
             for field in allowed_fields:
                 if field in data:
                     if field in ['x', 'y', 'width', 'height', 'opacity']:
                         update_data[field] = float(data[field])
+                    elif field == 'z_order':
+                        update_data[field] = int(data[field])
                     else:
                         update_data[field] = data[field]
             
@@ -177,6 +236,8 @@ def update_overlay(overlay_id):
             overlay = db.overlays.find_one({'_id': ObjectId(overlay_id)})
             overlay = serialize_overlay(overlay)
         
+        bump_scene_version(overlay.get('scene_id'))
+        
         return jsonify({
             'success': True,
             'overlay': overlay
@@ -201,6 +262,8 @@ def delete_overlay(overlay_id):
                 return jsonify({'success': False, 'error': 'Overlay not found'}), 404
             db.overlays.delete_one({'_id': ObjectId(overlay_id)})
         
+        bump_scene_version(overlay.get('scene_id'))
+        
         return jsonify({
             'success': True,
             'message': 'Overlay deleted successfully'
@@ -211,16 +274,24 @@ def delete_overlay(overlay_id):
 
 @overlays_bp.route('/overlays', methods=['DELETE'])
 def delete_all_overlays():
-    """Delete all overlays"""
+    """Delete all overlays outside any scene, or all of one scene's with ?scene_id="""
     try:
+        scene_id = request.args.get('scene_id')
+        if scene_id is not None and not scene_exists(scene_id):
+            return jsonify({'success': False, 'error': 'Scene not found'}), 404
+        
         if use_memory_storage():
-            count = len(in_memory_overlays)
-            in_memory_overlays.clear()
+            remaining = [o for o in in_memory_overlays if o.get('scene_id') != scene_id]
+            count = len(in_memory_overlays) - len(remaining)
+            in_memory_overlays[:] = remaining
         else:
             db = get_db()
-            result = db.overlays.delete_many({})
+            query = {'scene_id': scene_id} if scene_id else {'scene_id': {'$exists': False}}
+            result = db.overlays.delete_many(query)
             count = result.deleted_count
         
+        bump_scene_version(scene_id)
+        
         return jsonify({
             'success': True,
             'message': f'Deleted {count} overlays'
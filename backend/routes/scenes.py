@@ -0,0 +1,252 @@
+from flask import Blueprint, Response, request, jsonify
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime
+from db import get_db
+from routes.overlays import (
+    in_memory_overlays, in_memory_scenes, use_memory_storage, serialize_overlay,
+    is_valid_scene_id
+)
+import gzip
+import json
+import threading
+import uuid
+
+scenes_bp = Blueprint('scenes', __name__)
+
+# Only the fields the player needs to draw an overlay
+RENDER_FIELDS = ['_id', 'type', 'content', 'label', 'url', 'x', 'y', 'width', 'height',
+                 'fontSize', 'color', 'backgroundColor', 'opacity', 'z_order']
+RENDER_PROJECTION = {field: 1 for field in RENDER_FIELDS}
+
+# In-memory fallback for the active scene pointer
+in_memory_active_scene = {'scene_id': None}
+
+# Pre-serialized bundles: scene_id -> {'version', 'etag', 'body', 'gzip'}
+bundle_cache = {}
+bundle_lock = threading.Lock()
+
+def serialize_scene(scene):
+    """Convert a scene document to a JSON-serializable dict"""
+    return {
+        '_id': str(scene['_id']),
+        'name': scene['name'],
+        'version': scene['version']
+    }
+
+def find_scene(scene_id):
+    """Load a scene by ID, or None if it doesn't exist"""
+    if not is_valid_scene_id(scene_id):
+        return None
+    if use_memory_storage():
+        return next((s for s in in_memory_scenes if s['_id'] == scene_id), None)
+    return get_db().scenes.find_one({'_id': ObjectId(scene_id)})
+
+def get_active_scene_id():
+    """Get the ID of the scene currently on air"""
+    if use_memory_storage():
+        return in_memory_active_scene['scene_id']
+    pointer = get_db().settings.find_one({'_id': 'active_scene'})
+    return pointer['scene_id'] if pointer else None
+
+def load_scene_overlays(scene_id):
+    """Load a scene's overlays in z-order, projected to render fields"""
+    if use_memory_storage():
+        overlays = sorted(
+            (o for o in in_memory_overlays if o.get('scene_id') == scene_id),
+            key=lambda o: o['z_order']
+        )
+        return [{k: o[k] for k in RENDER_FIELDS if k in o} for o in overlays]
+
+    cursor = get_db().overlays.find({'scene_id': scene_id}, RENDER_PROJECTION).sort('z_order', 1)
+    return [serialize_overlay(overlay) for overlay in cursor]
+
+def get_bundle(scene):
+    """Get the compiled bundle for the scene's current version"""
+    scene_id = str(scene['_id'])
+    version = scene['version']
+
+    cached = bundle_cache.get(scene_id)
+    if cached and cached['version'] == version:
+        return cached
+
+    # Scene was read before its overlays, so the bundle is never older than
+    # the version it is cached under
+    body = json.dumps({
+        'success': True,
+        'scene': serialize_scene(scene),
+        'overlays': load_scene_overlays(scene_id)
+    }, separators=(',', ':')).encode('utf-8')
+
+    bundle = {
+        'version': version,
+        'etag': f'{scene_id}-{version}',
+        'body': body,
+        'gzip': gzip.compress(body)
+    }
+    with bundle_lock:
+        cached = bundle_cache.get(scene_id)
+        if not cached or cached['version'] <= version:
+            bundle_cache[scene_id] = bundle
+    return bundle
+
+def bundle_response(bundle):
+    """Send a pre-serialized bundle, gzipped when the client accepts it"""
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = Response(bundle['gzip'], mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        # Strong validators must differ between content-codings
+        response.set_etag(f"{bundle['etag']}-gz")
+    else:
+        response = Response(bundle['body'], mimetype='application/json')
+        response.set_etag(bundle['etag'])
+
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'  # Revalidate with the ETag
+    return response.make_conditional(request)
+
+@scenes_bp.route('/scenes', methods=['POST'])
+def create_scene():
+    """Create a new, empty scene"""
+    try:
+        data = request.get_json(silent=True)
+        name = data.get('name') if isinstance(data, dict) else None
+
+        if not isinstance(name, str) or not name.strip():
+            return jsonify({'success': False, 'error': 'Missing required field: name'}), 400
+        name = name.strip()
+
+        scene = {
+            'name': name,
+            'version': 1,
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+
+        if use_memory_storage():
+            if any(s['name'] == name for s in in_memory_scenes):
+                return jsonify({'success': False, 'error': 'Scene name already exists'}), 409
+            scene['_id'] = str(uuid.uuid4())
+            in_memory_scenes.append(scene)
+        else:
+            db = get_db()
+            if db.scenes.find_one({'name': name}):
+                return jsonify({'success': False, 'error': 'Scene name already exists'}), 409
+            try:
+                result = db.scenes.insert_one(scene)
+            except DuplicateKeyError:
+                # Lost a race with a concurrent create of the same name
+                return jsonify({'success': False, 'error': 'Scene name already exists'}), 409
+            scene['_id'] = result.inserted_id
+
+        return jsonify({
+            'success': True,
+            'scene': serialize_scene(scene)
+        }), 201
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@scenes_bp.route('/scenes', methods=['GET'])
+def get_scenes():
+    """Get all scenes and which one is active"""
+    try:
+        if use_memory_storage():
+            scenes = in_memory_scenes.copy()
+        else:
+            scenes = list(get_db().scenes.find().sort('created_at', 1))
+
+        return jsonify({
+            'success': True,
+            'scenes': [serialize_scene(scene) for scene in scenes],
+            'activeSceneId': get_active_scene_id()
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@scenes_bp.route('/scenes/active/bundle', methods=['GET'])
+def get_active_bundle():
+    """Get the compiled bundle of the active scene"""
+    try:
+        scene_id = get_active_scene_id()
+        scene = find_scene(scene_id) if scene_id else None
+        if not scene:
+            return jsonify({'success': False, 'error': 'No active scene'}), 404
+
+        return bundle_response(get_bundle(scene))
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@scenes_bp.route('/scenes/<scene_id>/bundle', methods=['GET'])
+def get_scene_bundle(scene_id):
+    """Get the compiled bundle of a scene"""
+    try:
+        scene = find_scene(scene_id)
+        if not scene:
+            return jsonify({'success': False, 'error': 'Scene not found'}), 404
+
+        return bundle_response(get_bundle(scene))
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@scenes_bp.route('/scenes/<scene_id>/activate', methods=['POST'])
+def activate_scene(scene_id):
+    """Make a scene active and return its bundle"""
+    try:
+        scene = find_scene(scene_id)
+        if not scene:
+            return jsonify({'success': False, 'error': 'Scene not found'}), 404
+
+        # Compile before switching so the first viewer request is a cache hit
+        bundle = get_bundle(scene)
+
+        # Single-document write, so viewers see either the old or new scene
+        if use_memory_storage():
+            in_memory_active_scene['scene_id'] = scene_id
+        else:
+            get_db().settings.update_one(
+                {'_id': 'active_scene'},
+                {'$set': {'scene_id': scene_id, 'updated_at': datetime.utcnow()}},
+                upsert=True
+            )
+
+        return bundle_response(bundle)
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@scenes_bp.route('/scenes/<scene_id>', methods=['DELETE'])
+def delete_scene(scene_id):
+    """Delete a scene and its overlays"""
+    try:
+        if use_memory_storage():
+            scene = find_scene(scene_id)
+            if not scene:
+                return jsonify({'success': False, 'error': 'Scene not found'}), 404
+            in_memory_overlays[:] = [o for o in in_memory_overlays if o.get('scene_id') != scene_id]
+            in_memory_scenes.remove(scene)
+            if in_memory_active_scene['scene_id'] == scene_id:
+                in_memory_active_scene['scene_id'] = None
+        else:
+            if not is_valid_scene_id(scene_id):
+                return jsonify({'success': False, 'error': 'Scene not found'}), 404
+            db = get_db()
+            result = db.scenes.delete_one({'_id': ObjectId(scene_id)})
+            if result.deleted_count == 0:
+                return jsonify({'success': False, 'error': 'Scene not found'}), 404
+            db.overlays.delete_many({'scene_id': scene_id})
+            db.settings.delete_one({'_id': 'active_scene', 'scene_id': scene_id})
+
+        with bundle_lock:
+            bundle_cache.pop(scene_id, None)
+
+        return jsonify({
+            'success': True,
+            'message': 'Scene deleted successfully'
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,115 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from werkzeug.security import safe_join
+
+class HLSFileCache:
+    """Single-flight, micro-cached reader for HLS playlists and segments.
+
+    Every viewer polls the same playlist roughly once per segment, so the
+    file is read from disk at most once per change and the bytes are shared
+    by all concurrent requests. Entries are revalidated against the file's
+    mtime/size once the micro-cache TTL expires.
+    """
+
+    def __init__(self, directory, ttl=0.5, max_entries=32):
+        self.directory = directory
+        self.ttl = ttl  # Seconds an entry is served without touching disk
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # filename -> entry dict (LRU order)
+        self._locks = {}  # filename -> lock, so only one request reads a file
+        self._lock = threading.Lock()
+
+    def get(self, filename):
+        """Return the cache entry for filename, reading from disk if stale.
+
+        Raises FileNotFoundError if the file does not exist or resolves
+        outside the cache directory.
+        """
+        if self._resolve(filename) is None:
+            raise FileNotFoundError(filename)
+
+        entry = self._lookup(filename)
+        if entry and time.monotonic() - entry['checked_at'] < self.ttl:
+            return entry
+
+        # Single-flight: one request revalidates, the rest wait and reuse it
+        with self._key_lock(filename):
+            entry = self._lookup(filename)
+            if entry and time.monotonic() - entry['checked_at'] < self.ttl:
+                return entry
+            return self._load(filename, entry)
+
+    def invalidate(self, filename=None):
+        """Drop one cached file, or everything if filename is None"""
+        with self._lock:
+            if filename is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(filename, None)
+
+    def _lookup(self, filename):
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None:
+                self._entries.move_to_end(filename)
+            return entry
+
+    def _key_lock(self, filename):
+        with self._lock:
+            lock = self._locks.get(filename)
+            if lock is None:
+                lock = self._locks[filename] = threading.Lock()
+            return lock
+
+    def _load(self, filename, entry):
+        """Stat the file and re-read it only if FFmpeg has rewritten it"""
+        path = self._resolve(filename)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._forget(filename)
+            raise
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if entry and entry['signature'] == signature:
+            entry['checked_at'] = time.monotonic()
+            return entry
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Segment removed by delete_segments between stat and open
+            self._forget(filename)
+            raise
+
+        entry = {
+            'data': data,
+            'etag': hashlib.sha1(data).hexdigest(),
+            'signature': signature,
+            'checked_at': time.monotonic()
+        }
+
+        with self._lock:
+            self._entries[filename] = entry
+            self._entries.move_to_end(filename)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._locks.pop(evicted, None)
+        return entry
+
+    def _resolve(self, filename):
+        """Join filename onto the directory, or None if it would escape it"""
+        # safe_join rejects absolute paths (including Windows drive paths),
+        # '..' segments and alternate separators
+        if ':' in filename:
+            return None  # Windows drive-relative paths like 'D:x.ts'
+        return safe_join(self.directory, filename)
+
+    def _forget(self, filename):
+        with self._lock:
+            self._entries.pop(filename, None)
+            self._locks.pop(filename, None)
@@ -0,0 +1,234 @@
+import os
+import time
+import hashlib
+import threading
+from io import BytesIO
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+MAX_DIMENSION = 4096
+SIZE_STEP = 64  # Round requested sizes up so resizing an overlay reuses variants
+
+# Output formats: extension -> (mimetype, Pillow format)
+OUTPUT_FORMATS = {
+    'avif': ('image/avif', 'AVIF'),
+    'webp': ('image/webp', 'WEBP'),
+    'png': ('image/png', 'PNG'),
+    'jpeg': ('image/jpeg', 'JPEG'),
+}
+# Negotiated formats in order of preference; 'original' means PNG or JPEG,
+# decided from the decoded image when the variant is rendered
+PREFERRED_FORMATS = ['avif', 'webp']
+
+class ImageVariantCache:
+    """Downscale and recompress proxied images, caching variants on disk.
+
+    Overlays are rarely shown larger than a few hundred pixels, so the
+    source image is resized to the requested box and re-encoded in the best
+    format the browser accepts. Encoding runs in a thread pool and
+    identical concurrent requests share one job. Variants expire after
+    max_age seconds and the least recently used are swept once the cache
+    grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_workers=2, max_bytes=256 * 1024 * 1024, max_age=86400):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age  # Seconds before the origin is fetched again
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-variant')
+        self._pending = {}  # variant key -> Future, so one job runs per variant
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._scan())
+
+    def negotiate_format(self, accept_header):
+        """Pick 'avif', 'webp' or 'original' from the Accept header"""
+        accept = accept_header or ''
+        for name in PREFERRED_FORMATS:
+            mimetype, pil_format = OUTPUT_FORMATS[name]
+            if mimetype in accept and self._can_encode(pil_format):
+                return name
+        return 'original'
+
+    def variant_key(self, url, width, height, choice):
+        """Stable cache key for one derived variant"""
+        raw = f'{url}|{self._bucket(width)}|{self._bucket(height)}|{choice}'
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def lookup(self, key):
+        """Return (path, mimetype) of a fresh cached variant, or None"""
+        for ext, (mimetype, _) in OUTPUT_FORMATS.items():
+            path = self._variant_path(key, ext)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            if time.time() - stat.st_mtime > self.max_age:
+                # Expired: drop it so the origin is fetched again
+                self._remove(path, stat.st_size)
+                return None
+
+            # Record the hit in atime so the LRU sweep keeps hot variants
+            os.utime(path, (time.time(), stat.st_mtime))
+            return path, mimetype
+        return None
+
+    def get_or_build(self, key, fetch, width, height, choice):
+        """Return (path, mimetype, None) for a variant, or (None, mimetype,
+        original bytes) when the image can't be processed.
+
+        fetch() downloads the source as (content_type, bytes). On a miss the
+        first request fetches, renders and writes the variant; concurrent
+        requests for the same key wait for its result instead of downloading
+        the source again.
+        """
+        cached = self.lookup(key)
+        if cached:
+            return cached[0], cached[1], None
+
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._fetch_and_render(key, fetch, width, height, choice)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._forget(key)
+
+    @staticmethod
+    def is_processable(content_type, data):
+        """Only still raster images are resized; SVG and animations pass through"""
+        if not PIL_AVAILABLE or content_type == 'image/svg+xml':
+            return False
+        try:
+            with Image.open(BytesIO(data)) as img:
+                return not getattr(img, 'is_animated', False)
+        except Exception:
+            return False
+
+    def _fetch_and_render(self, key, fetch, width, height, choice):
+        content_type, data = fetch()
+        if not self.is_processable(content_type, data):
+            return None, content_type, data
+
+        # Encode in the worker pool; fall back to the original on failure
+        try:
+            path, mimetype = self.executor.submit(self._render, key, data, width, height, choice).result()
+        except Exception as e:
+            print(f"Warning: Could not process image variant {key}: {e}")
+            return None, content_type, data
+        return path, mimetype, None
+
+    def _render(self, key, data, width, height, choice):
+        with Image.open(BytesIO(data)) as img:
+            source_format = img.format
+            img = ImageOps.exif_transpose(img)
+            # thumbnail() keeps aspect ratio and never upscales
+            img.thumbnail((self._bucket(width) or MAX_DIMENSION, self._bucket(height) or MAX_DIMENSION))
+
+            if choice != 'original':
+                ext = choice
+            elif self._has_alpha(img) or source_format == 'PNG':
+                ext = 'png'  # JPEG would turn transparent areas black
+            else:
+                ext = 'jpeg'
+            mimetype, pil_format = OUTPUT_FORMATS[ext]
+
+            if pil_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            elif img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                img = img.convert('RGBA')
+
+            buffer = BytesIO()
+            save_options = {'optimize': True} if pil_format in ('PNG', 'JPEG') else {}
+            if pil_format != 'PNG':
+                save_options['quality'] = 80
+            img.save(buffer, format=pil_format, **save_options)
+
+        # Write atomically so a concurrent reader never sees a partial file
+        path = self._variant_path(key, ext)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += buffer.tell()
+            over_limit = self._size > self.max_bytes
+        if over_limit:
+            self._sweep()
+        return path, mimetype
+
+    def _sweep(self):
+        """Delete expired variants, then least recently used ones, until
+        the cache is back under 90% of max_bytes"""
+        now = time.time()
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for path, size, last_used in entries:
+            if total <= target and now - last_used <= self.max_age:
+                continue
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._size = total
+
+    def _scan(self):
+        """Yield (path, size, last used time) for every cached variant"""
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                yield entry.path, stat.st_size, max(stat.st_atime, stat.st_mtime)
+
+    def _remove(self, path, size):
+        try:
+            os.unlink(path)
+        except OSError:
+            return
+        with self._lock:
+            self._size -= size
+
+    def _forget(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def _variant_path(self, key, ext):
+        return os.path.join(self.cache_dir, f'{key}.{ext}')
+
+    @staticmethod
+    def _has_alpha(img):
+        return img.mode in ('RGBA', 'LA', 'PA', 'RGBa', 'La') or 'transparency' in img.info
+
+    @staticmethod
+    def _bucket(size):
+        if not size:
+            return 0
+        size = min(int(size), MAX_DIMENSION)
+        return min(-(-size // SIZE_STEP) * SIZE_STEP, MAX_DIMENSION)
+
+    @staticmethod
+    def _can_encode(pil_format):
+        if not PIL_AVAILABLE:
+            return False
+        Image.init()
+        return pil_format in Image.SAVE
@@ -3,14 +3,33 @@ import os
 import signal
 import time
 import shutil
+import re
 import threading
 from collections import deque
 
+# Extra output types that can be fanned out from the single FFmpeg encode
+OUTPUT_TYPES = ['record', 'rtmp', 'srt', 'hls']
+RECORD_FORMATS = {'mp4': 'mp4', 'mkv': 'matroska'}
+
+# Secondary tee outputs are dropped on error and each gets its own fifo
+# queue. A full queue drops packets instead of blocking the tee (and so the
+# live HLS). Only network pushes reconnect: recovering a file output would
+# reopen and truncate it. The ':' inside fifo_options is escaped twice, once
+# for tee's '|' split and once for its per-slave option parser.
+FILE_SLAVE_OPTIONS = 'onfail=ignore:use_fifo=1:fifo_options=drop_pkts_on_overflow=1'
+NETWORK_SLAVE_OPTIONS = (
+    'onfail=ignore:use_fifo=1:fifo_options=drop_pkts_on_overflow=1'
+    '\\\\:attempt_recovery=1\\\\:recover_any_error=1'
+)
+
 class RTSPConverter:
-    def __init__(self):
+    def __init__(self, hls_cache=None):
         self.process = None
+        self.hls_cache = hls_cache  # Optional HLSFileCache to invalidate on restart
         # Use absolute path relative to this file's directory
-        self.hls_output_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'hls')
+        self.base_dir = os.path.dirname(os.path.dirname(__file__))
+        self.hls_output_dir = os.path.join(self.base_dir, 'hls')
+        self.recordings_dir = os.path.join(self.base_dir, 'recordings')
         self.playlist_name = 'stream.m3u8'
         self.log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
         self.log_file = os.path.join(self.log_dir, 'ffmpeg.log')
@@ -19,6 +38,7 @@ class RTSPConverter:
         self.state = 'stopped'  # stopped, starting, running, error
         self.rtsp_url = None
         self.mode = None  # 'obs' or 'public'
+        self.outputs = []  # Extra outputs fed from the same encode via tee
         self.last_error = None
         self.last_start_time = None
         self.stderr_lines = deque(maxlen=50)  # Keep last 50 lines
@@ -27,11 +47,12 @@ class RTSPConverter:
         os.makedirs(self.hls_output_dir, exist_ok=True)
         os.makedirs(self.log_dir, exist_ok=True)
         
-    def start_conversion(self, rtsp_url, mode='public'):
-        """Start converting RTSP stream to HLS"""
+    def start_conversion(self, rtsp_url, mode='public', outputs=None):
+        """Start converting RTSP stream to HLS, plus any extra outputs"""
         # Validate input
         if not rtsp_url or not rtsp_url.startswith('rtsp://'):
             raise ValueError("Invalid RTSP URL. Must start with 'rtsp://'")
+        outputs = self._validate_outputs(outputs or [])
         
         # Stop any existing conversion
         self.stop_conversion()
@@ -40,6 +61,7 @@ class RTSPConverter:
         self.state = 'starting'
         self.rtsp_url = rtsp_url
         self.mode = mode
+        self.outputs = outputs
         self.last_error = None
         self.last_start_time = time.time()
         self.stderr_lines.clear()
@@ -74,15 +96,28 @@ class RTSPConverter:
             '-c:a', 'aac',  # Encode audio to AAC (widely supported)
             '-b:a', '128k',  # Audio bitrate
             '-ar', '44100',  # Audio sample rate
-            # HLS output settings
-            '-f', 'hls',
-            '-hls_time', '1',  # 1 second segments
-            '-hls_list_size', '3',  # Keep only last 3 segments (3 seconds total)
-            '-hls_flags', 'delete_segments+append_list+independent_segments',  # Independent segments for smooth playback
-            '-hls_segment_filename', segment_pattern,
-            output_path
         ]
         
+        if outputs:
+            # One ingest, one encode, fanned out to every destination by tee
+            ffmpeg_cmd += [
+                '-map', '0:v:0',
+                '-map', '0:a:0?',  # Audio is optional (some cameras have none)
+                '-flags', '+global_header',  # Required by FLV/MP4 outputs
+                '-f', 'tee',
+                self._build_tee_spec(outputs)
+            ]
+        else:
+            # HLS output settings
+            ffmpeg_cmd += [
+                '-f', 'hls',
+                '-hls_time', '1',  # 1 second segments
+                '-hls_list_size', '3',  # Keep only last 3 segments (3 seconds total)
+                '-hls_flags', 'delete_segments+append_list+independent_segments',  # Independent segments for smooth playback
+                '-hls_segment_filename', segment_pattern,
+                output_path
+            ]
+        
         try:
             # Open log file
             log_file_handle = open(self.log_file, 'w')
@@ -94,7 +129,8 @@ class RTSPConverter:
                 stderr=log_file_handle,
                 stdin=subprocess.PIPE,
                 bufsize=1,
-                universal_newlines=False
+                universal_newlines=False,
+                cwd=self.base_dir  # Tee output paths are relative to backend/
             )
             
             # Start stderr monitoring thread
@@ -164,6 +200,7 @@ class RTSPConverter:
                 self.state = 'stopped'
                 self.rtsp_url = None
                 self.mode = None
+                self.outputs = []
         
         # Also kill any orphaned ffmpeg processes (Windows-specific cleanup)
         if os.name == 'nt':
@@ -196,12 +233,101 @@ class RTSPConverter:
             'state': self.state,
             'mode': self.mode,
             'rtspUrl': self.rtsp_url,
+            'outputs': self.outputs,
             'hlsReady': hls_ready,
             'lastError': self.last_error,
             'lastStartTime': self.last_start_time,
             'recentLogs': list(self.stderr_lines)
         }
     
+    def _validate_outputs(self, outputs):
+        """Validate extra output definitions and return normalized copies"""
+        if not isinstance(outputs, list):
+            raise ValueError("outputs must be a list")
+        
+        normalized = []
+        hls_names = set()
+        for output in outputs:
+            if not isinstance(output, dict) or output.get('type') not in OUTPUT_TYPES:
+                raise ValueError(f"Invalid output type. Must be one of: {', '.join(OUTPUT_TYPES)}")
+            
+            output_type = output['type']
+            if output_type == 'record':
+                record_format = output.get('format', 'mp4')
+                if not isinstance(record_format, str) or record_format not in RECORD_FORMATS:
+                    raise ValueError("Recording format must be 'mp4' or 'mkv'")
+                normalized.append({'type': 'record', 'format': record_format})
+            elif output_type in ('rtmp', 'srt'):
+                url = output.get('url', '')
+                if not isinstance(url, str) or not url.startswith(f'{output_type}://'):
+                    raise ValueError(f"Invalid {output_type.upper()} URL. Must start with '{output_type}://'")
+                normalized.append({'type': output_type, 'url': url})
+            else:
+                # Second HLS profile, e.g. a longer DVR window under /hls/<name>/
+                name = output.get('name', '')
+                if not isinstance(name, str) or not re.fullmatch(r'[A-Za-z0-9_-]+', name) or name in hls_names:
+                    raise ValueError("HLS outputs need a unique 'name' of letters, digits, '-' or '_'")
+                hls_names.add(name)
+                
+                try:
+                    hls_time = int(output.get('hlsTime', 4))
+                    list_size = int(output.get('listSize', 10))
+                except (TypeError, ValueError):
+                    raise ValueError("HLS 'hlsTime' and 'listSize' must be integers")
+                if hls_time < 1:
+                    raise ValueError("HLS 'hlsTime' must be at least 1 second")
+                if list_size < 0:
+                    raise ValueError("HLS 'listSize' must be 0 (keep all) or more")
+                
+                normalized.append({
+                    'type': 'hls',
+                    'name': name,
+                    'hlsTime': hls_time,
+                    'listSize': list_size
+                })
+        return normalized
+    
+    def _build_tee_spec(self, outputs):
+        """Build the tee muxer target: live HLS first, secondaries after it"""
+        # Paths are relative (FFmpeg runs in backend/) so no drive letters or
+        # backslashes end up inside tee's ':'/'|' separated syntax
+        slaves = [
+            '[f=hls:hls_time=1:hls_list_size=3'
+            ':hls_flags=delete_segments+append_list+independent_segments'
+            f':hls_segment_filename=hls/seg_%03d.ts]hls/{self.playlist_name}'
+        ]
+        
+        for output in outputs:
+            # Secondaries can fail or fall behind without touching the live HLS
+            if output['type'] == 'record':
+                os.makedirs(self.recordings_dir, exist_ok=True)
+                ext = output['format']
+                filename = f"recordings/stream_{time.strftime('%Y%m%d_%H%M%S')}.{ext}"
+                options = f"f={RECORD_FORMATS[ext]}:{FILE_SLAVE_OPTIONS}"
+                if ext == 'mp4':
+                    # Fragmented MP4 stays playable if FFmpeg is killed
+                    options += ':movflags=+frag_keyframe+empty_moov'
+                slaves.append(f'[{options}]{filename}')
+            elif output['type'] == 'rtmp':
+                slaves.append(f"[f=flv:{NETWORK_SLAVE_OPTIONS}]{self._tee_escape(output['url'])}")
+            elif output['type'] == 'srt':
+                slaves.append(f"[f=mpegts:{NETWORK_SLAVE_OPTIONS}]{self._tee_escape(output['url'])}")
+            else:
+                name = output['name']
+                os.makedirs(os.path.join(self.hls_output_dir, name), exist_ok=True)
+                slaves.append(
+                    f"[f=hls:{FILE_SLAVE_OPTIONS}:hls_time={output['hlsTime']}:hls_list_size={output['listSize']}"
+                    ':hls_flags=delete_segments+independent_segments'
+                    f":hls_segment_filename=hls/{name}/seg_%03d.ts]hls/{name}/{self.playlist_name}"
+                )
+        
+        return '|'.join(slaves)
+    
+    @staticmethod
+    def _tee_escape(value):
+        """Escape characters that tee treats as separators or quoting"""
+        return re.sub(r"([\\'|\[\]])", r'\\\1', value)
+    
     def _monitor_stderr(self):
         """Monitor FFmpeg stderr output in background thread"""
         try:
@@ -240,3 +366,7 @@ class RTSPConverter:
         
         # Recreate the directory to ensure it's clean
         os.makedirs(self.hls_output_dir, exist_ok=True)
+        
+        # Drop cached playlist/segments from the previous FFmpeg run
+        if self.hls_cache is not None:
+            self.hls_cache.invalidate()